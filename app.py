@@ -1,15 +1,25 @@
 from flask import Flask, request, jsonify
 from flask_cors import CORS
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import selectinload
+from sqlalchemy.ext.hybrid import hybrid_property
 from flask_jwt_extended import JWTManager, create_access_token, jwt_required, get_jwt_identity
 from flask_bcrypt import Bcrypt
 import os
 from datetime import datetime, timedelta
 import pandas as pd
 import numpy as np
+from numba import njit
 from werkzeug.utils import secure_filename
 import json
+import io
 from flasgger import Swagger
+import orjson
+import msgpack
+from cachetools import TTLCache
+from threading import Lock
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'your-secret-key-change-in-production')
@@ -21,14 +31,67 @@ app.config['JWT_ALGORITHM'] = 'HS256'
 app.config['JWT_TOKEN_LOCATION'] = ['headers']
 app.config['JWT_HEADER_NAME'] = 'Authorization'
 app.config['JWT_HEADER_TYPE'] = 'Bearer'
+app.config['BCRYPT_LOG_ROUNDS'] = int(os.environ.get('BCRYPT_LOG_ROUNDS', 10))
 
 # Initialize extensions
 db = SQLAlchemy(app)
 jwt = JWTManager(app)
 bcrypt = Bcrypt(app)
-CORS(app)
+CORS(
+    app,
+    resources={r'/api/*': {'origins': os.environ.get('CORS_ORIGINS', '*').split(',')}},
+    max_age=86400,
+    supports_credentials=False
+)
 Swagger(app)
 
+# SQLite tuning: WAL journaling and one fsync per checkpoint instead of per commit
+def set_sqlite_pragmas(dbapi_conn, connection_record):
+    cursor = dbapi_conn.cursor()
+    cursor.execute('PRAGMA journal_mode=WAL')
+    cursor.execute('PRAGMA synchronous=NORMAL')
+    cursor.execute('PRAGMA temp_store=MEMORY')
+    cursor.close()
+
+if app.config['SQLALCHEMY_DATABASE_URI'].startswith('sqlite:'):
+    with app.app_context():
+        event.listen(db.engine, 'connect', set_sqlite_pragmas)
+
+# Compared against when the email is unknown so login timing does not reveal registered users.
+# Uses the highest cost still in use: existing hashes keep the previous default of 12.
+DUMMY_PASSWORD_HASH = bcrypt.generate_password_hash(
+    os.urandom(16).hex(),
+    rounds=max(12, app.config['BCRYPT_LOG_ROUNDS'])
+).decode('utf-8')
+
+def ojsonify(obj, status=200):
+    """Build a JSON response with orjson, serializing NumPy arrays natively"""
+    return app.response_class(
+        orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY),
+        status=status,
+        mimetype='application/json'
+    )
+
+def msgpack_default(obj):
+    """Convert NumPy arrays and scalars into types MessagePack can pack"""
+    if isinstance(obj, (np.ndarray, np.generic)):
+        return obj.tolist()
+    raise TypeError(f'Cannot serialize {type(obj).__name__} to MessagePack')
+
+def msgpackify(obj, status=200):
+    """Build a MessagePack response, packing floats as float32 like the TOPSIS results"""
+    return app.response_class(
+        msgpack.packb(obj, use_bin_type=True, use_single_float=True, default=msgpack_default),
+        status=status,
+        mimetype='application/msgpack'
+    )
+
+# Answer CORS preflight requests before any view or JWT handling runs
+@app.before_request
+def handle_preflight():
+    if request.method == 'OPTIONS' and request.url_rule is not None:
+        return app.make_default_options_response()
+
 # JWT Error Handlers
 @jwt.expired_token_loader
 def expired_token_callback(jwt_header, jwt_payload):
@@ -68,6 +131,8 @@ class Project(db.Model):
     last_modified = db.Column(db.DateTime, default=datetime.utcnow)
     criteria = db.relationship('Criterion', backref='project', lazy=True, cascade='all, delete-orphan')
     alternatives = db.relationship('Alternative', backref='project', lazy=True, cascade='all, delete-orphan')
+    matrix = db.relationship('ProjectMatrix', backref='project', lazy=True, uselist=False, cascade='all, delete-orphan')
+    __table_args__ = (db.Index('ix_project_user', 'user_id'),)
 
 class Criterion(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -76,84 +141,196 @@ class Criterion(db.Model):
     criterion_type = db.Column(db.String(10), nullable=False)  # 'benefit' or 'cost'
     weight = db.Column(db.Float, nullable=False)
     values = db.relationship('AlternativeCriterionValue', backref='criterion', lazy=True, cascade='all, delete-orphan')
+    __table_args__ = (db.Index('ix_crit_project', 'project_id'),)
+    
+    @hybrid_property
+    def is_benefit(self):
+        return self.criterion_type == 'benefit'
 
 class Alternative(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     project_id = db.Column(db.Integer, db.ForeignKey('project.id'), nullable=False)
     name = db.Column(db.String(255), nullable=False)
     values = db.relationship('AlternativeCriterionValue', backref='alternative', lazy=True, cascade='all, delete-orphan')
+    __table_args__ = (db.Index('ix_alt_project', 'project_id'),)
 
 class AlternativeCriterionValue(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     alternative_id = db.Column(db.Integer, db.ForeignKey('alternative.id'), nullable=False)
     criterion_id = db.Column(db.Integer, db.ForeignKey('criterion.id'), nullable=False)
     value = db.Column(db.Float, nullable=False)
+    __table_args__ = (db.Index('ix_acv_alt_crit', 'alternative_id', 'criterion_id', unique=True),)
+
+class ProjectMatrix(db.Model):
+    project_id = db.Column(db.Integer, db.ForeignKey('project.id'), primary_key=True)
+    columns = db.Column(db.LargeBinary, nullable=False)  # column-major .npy of the decision matrix
+    alt_order = db.Column(db.Text, nullable=False)  # JSON list of alternative IDs, one per row
+    crit_order = db.Column(db.Text, nullable=False)  # JSON list of criterion IDs, one per column
+    version = db.Column(db.DateTime, nullable=False)  # project.last_modified the matrix was built from
+
+# Decision Matrix Cache
+def invalidate_project_matrix(project_id):
+    """Drop the cached decision matrix of a project"""
+    ProjectMatrix.query.filter_by(project_id=project_id).delete()
+
+def load_project_matrix(project):
+    """Get the decision matrix of a project, rebuilding the cached copy when stale"""
+    # The project is read before the values, so the stored version is never newer
+    # than the values it describes and a concurrent edit only forces a rebuild
+    version = project.last_modified
+    alt_ids = [a.id for a in project.alternatives]
+    crit_ids = [c.id for c in project.criteria]
+    
+    cached = ProjectMatrix.query.get(project.id)
+    if (cached and cached.version == version
+            and json.loads(cached.alt_order) == alt_ids and json.loads(cached.crit_order) == crit_ids):
+        return np.load(io.BytesIO(cached.columns))
+    
+    # Build the matrix from a single query over all values
+    alt_idx = {alt_id: i for i, alt_id in enumerate(alt_ids)}
+    crit_idx = {crit_id: j for j, crit_id in enumerate(crit_ids)}
+    rows = db.session.query(
+        AlternativeCriterionValue.alternative_id,
+        AlternativeCriterionValue.criterion_id,
+        AlternativeCriterionValue.value
+    ).join(Alternative).filter(Alternative.project_id == project.id).all()
+    
+    matrix = np.zeros((len(alt_idx), len(crit_idx)), dtype=np.float32, order='F')
+    for alt_id, crit_id, value in rows:
+        # Values are only filtered by alternative, and the alternative routes
+        # accept any criterion_id, so skip values for other projects' criteria
+        if crit_id in crit_idx:
+            matrix[alt_idx[alt_id], crit_idx[crit_id]] = value
+    
+    buffer = io.BytesIO()
+    np.save(buffer, matrix)
+    
+    # Store the cache on its own connection so committing does not expire the
+    # objects already loaded in this request's session
+    table = ProjectMatrix.__table__
+    try:
+        with db.engine.begin() as connection:
+            connection.execute(table.delete().where(table.c.project_id == project.id))
+            connection.execute(table.insert().values(
+                project_id=project.id,
+                columns=buffer.getvalue(),
+                alt_order=json.dumps(alt_ids),
+                crit_order=json.dumps(crit_ids),
+                version=version
+            ))
+    except IntegrityError:
+        # A concurrent calculation stored its matrix first
+        pass
+    
+    return matrix
+
+# User lookup cache, keyed by user ID. update_theme only evicts the entry in its own
+# worker process, so other workers may serve a stale theme for at most `ttl` seconds.
+user_cache = TTLCache(maxsize=10000, ttl=5)
+user_cache_lock = Lock()
+
+def get_user_cached(user_id):
+    """Get a user's public fields, caching them for a short TTL"""
+    with user_cache_lock:
+        user = user_cache.get(user_id)
+    if user is not None:
+        return user
+    
+    u = User.query.get(user_id)
+    if not u:
+        return None
+    
+    user = {
+        'id': u.id,
+        'email': u.email,
+        'theme_preference': u.theme_preference
+    }
+    with user_cache_lock:
+        user_cache[user_id] = user
+    return user
 
 # TOPSIS Calculation Functions
-def normalize_matrix(matrix):
-    """Normalize the decision matrix"""
-    denominator = np.sqrt(np.sum(matrix**2, axis=0))
-    return matrix / denominator
-
-def calculate_weighted_matrix(normalized_matrix, weights):
-    """Calculate weighted normalized matrix"""
-    return normalized_matrix * weights
-
-def find_ideal_solutions(weighted_matrix, criteria_types):
-    """Find positive and negative ideal solutions"""
-    A_plus = np.zeros(weighted_matrix.shape[1])
-    A_minus = np.zeros(weighted_matrix.shape[1])
-    
-    for j in range(weighted_matrix.shape[1]):
-        if criteria_types[j] == 'benefit':
-            A_plus[j] = weighted_matrix[:, j].max()
-            A_minus[j] = weighted_matrix[:, j].min()
+# fastmath without 'nnan'/'ninf': the kernel relies on infinities and NaN staying well defined
+@njit(cache=True, nogil=True, fastmath={'nsz', 'arcp', 'contract', 'afn', 'reassoc'}, error_model='numpy')
+def _topsis_kernel(matrix, weights, is_benefit):
+    """Compiled TOPSIS steps 1-5 over the decision matrix"""
+    n_alternatives, n_criteria = matrix.shape
+    # Output matrices are C-contiguous so orjson can serialize them directly
+    normalized_matrix = np.empty((n_alternatives, n_criteria), dtype=matrix.dtype)
+    weighted_matrix = np.empty((n_alternatives, n_criteria), dtype=matrix.dtype)
+    A_plus = np.empty(n_criteria, dtype=matrix.dtype)
+    A_minus = np.empty(n_criteria, dtype=matrix.dtype)
+    
+    # Steps 1-3: Normalize, weight and find ideal solutions column by column
+    for j in range(n_criteria):
+        total = 0.0
+        raw_max = -np.inf
+        raw_min = np.inf
+        for i in range(n_alternatives):
+            total += matrix[i, j] * matrix[i, j]
+            raw_max = max(raw_max, matrix[i, j])
+            raw_min = min(raw_min, matrix[i, j])
+        denominator = np.sqrt(total)
+        if denominator == 0:
+            denominator = 1.0
+        scale = weights[j] / denominator
+        
+        for i in range(n_alternatives):
+            normalized_matrix[i, j] = matrix[i, j] / denominator
+            weighted_matrix[i, j] = matrix[i, j] * scale
+        
+        # Scaling is monotonic, so the weighted extremes follow from the raw ones
+        if scale >= 0:
+            col_max = raw_max * scale
+            col_min = raw_min * scale
+        else:
+            col_max = raw_min * scale
+            col_min = raw_max * scale
+        
+        if is_benefit[j]:
+            A_plus[j] = col_max
+            A_minus[j] = col_min
         else:  # cost
-            A_plus[j] = weighted_matrix[:, j].min()
-            A_minus[j] = weighted_matrix[:, j].max()
-    
-    return A_plus, A_minus
-
-def calculate_distances(weighted_matrix, A_plus, A_minus):
-    """Calculate distances to ideal solutions"""
-    D_plus = np.sqrt(np.sum((weighted_matrix - A_plus)**2, axis=1))
-    D_minus = np.sqrt(np.sum((weighted_matrix - A_minus)**2, axis=1))
-    return D_plus, D_minus
-
-def calculate_preference_values(D_plus, D_minus):
-    """Calculate preference values"""
-    V = D_minus / (D_plus + D_minus)
-    return np.nan_to_num(V, nan=0.0)
-
-def perform_topsis_calculation(alternatives_data, criteria_weights, criteria_types):
+            A_plus[j] = col_min
+            A_minus[j] = col_max
+    
+    # Steps 4-5: Distances to ideal solutions and preference values
+    # The weighted matrix is C-contiguous, so walk it row by row
+    D_plus = np.empty(n_alternatives, dtype=matrix.dtype)
+    D_minus = np.empty(n_alternatives, dtype=matrix.dtype)
+    V = np.empty(n_alternatives, dtype=matrix.dtype)
+    for i in range(n_alternatives):
+        sum_plus = 0.0
+        sum_minus = 0.0
+        for j in range(n_criteria):
+            diff_plus = weighted_matrix[i, j] - A_plus[j]
+            diff_minus = weighted_matrix[i, j] - A_minus[j]
+            sum_plus += diff_plus * diff_plus
+            sum_minus += diff_minus * diff_minus
+        D_plus[i] = np.sqrt(sum_plus)
+        D_minus[i] = np.sqrt(sum_minus)
+        total = D_plus[i] + D_minus[i]
+        V[i] = D_minus[i] / total if total > 0 else 0.0
+    
+    return V, A_plus, A_minus, D_plus, D_minus, normalized_matrix, weighted_matrix
+
+def perform_topsis_calculation(alternatives_data, criteria_weights, is_benefit):
     """Perform complete TOPSIS calculation"""
-    # Convert to numpy arrays
-    matrix = np.array(alternatives_data)
-    weights = np.array(criteria_weights)
-    
-    # Step 1: Normalize matrix
-    normalized_matrix = normalize_matrix(matrix)
+    # Convert to float32 arrays for the compiled kernel, keeping columns contiguous
+    matrix = np.asfortranarray(alternatives_data, dtype=np.float32)
+    weights = np.ascontiguousarray(criteria_weights, dtype=np.float32)
+    is_benefit = np.ascontiguousarray(is_benefit, dtype=np.bool_)
     
-    # Step 2: Calculate weighted matrix
-    weighted_matrix = calculate_weighted_matrix(normalized_matrix, weights)
-    
-    # Step 3: Find ideal solutions
-    A_plus, A_minus = find_ideal_solutions(weighted_matrix, criteria_types)
-    
-    # Step 4: Calculate distances
-    D_plus, D_minus = calculate_distances(weighted_matrix, A_plus, A_minus)
-    
-    # Step 5: Calculate preference values
-    V = calculate_preference_values(D_plus, D_minus)
+    V, A_plus, A_minus, D_plus, D_minus, normalized_matrix, weighted_matrix = _topsis_kernel(matrix, weights, is_benefit)
     
     return {
-        'normalized_matrix': normalized_matrix.tolist(),
-        'weighted_matrix': weighted_matrix.tolist(),
-        'A_plus': A_plus.tolist(),
-        'A_minus': A_minus.tolist(),
-        'D_plus': D_plus.tolist(),
-        'D_minus': D_minus.tolist(),
-        'preference_values': V.tolist()
+        'normalized_matrix': normalized_matrix,
+        'weighted_matrix': weighted_matrix,
+        'A_plus': A_plus,
+        'A_minus': A_minus,
+        'D_plus': D_plus,
+        'D_minus': D_minus,
+        'preference_values': V
     }
 
 # Authentication Routes
@@ -183,7 +360,16 @@ def login():
     password = data.get('password')
     
     user = User.query.filter_by(email=email).first()
-    if user and bcrypt.check_password_hash(user.password, password):
+    if user is None:
+        bcrypt.check_password_hash(DUMMY_PASSWORD_HASH, password or '')
+        return jsonify({'error': 'Invalid credentials'}), 401
+    
+    if bcrypt.check_password_hash(user.password, password):
+        # Upgrade passwords stored with a lower work factor; never downgrade
+        if int(user.password.split('$')[2]) < app.config['BCRYPT_LOG_ROUNDS']:
+            user.password = bcrypt.generate_password_hash(password).decode('utf-8')
+            db.session.commit()
+        
         access_token = create_access_token(identity=user.id)
         return jsonify({
             'access_token': access_token,
@@ -201,13 +387,18 @@ def login():
 @jwt_required()
 def get_projects():
     user_id = get_jwt_identity()
-    projects = Project.query.filter_by(user_id=user_id).all()
+    rows = db.session.query(
+        Project.id,
+        Project.name,
+        Project.creation_date,
+        Project.last_modified
+    ).filter_by(user_id=user_id).all()
     return jsonify([{
-        'id': p.id,
-        'name': p.name,
-        'creation_date': p.creation_date.isoformat(),
-        'last_modified': p.last_modified.isoformat()
-    } for p in projects]), 200
+        'id': project_id,
+        'name': name,
+        'creation_date': creation_date.isoformat(),
+        'last_modified': last_modified.isoformat()
+    } for project_id, name, creation_date, last_modified in rows]), 200
 
 @app.route('/api/projects', methods=['POST'])
 @jwt_required()
@@ -234,7 +425,10 @@ def create_project():
 @jwt_required()
 def get_project(project_id):
     user_id = get_jwt_identity()
-    project = Project.query.filter_by(id=project_id, user_id=user_id).first()
+    project = Project.query.options(
+        selectinload(Project.criteria),
+        selectinload(Project.alternatives).selectinload(Alternative.values)
+    ).filter_by(id=project_id, user_id=user_id).first()
     
     if not project:
         return jsonify({'error': 'Project not found'}), 404
@@ -255,12 +449,12 @@ def get_project(project_id):
         } for v in a.values]
     } for a in project.alternatives]
     
-    return jsonify({
+    return ojsonify({
         'id': project.id,
         'name': project.name,
         'criteria': criteria,
         'alternatives': alternatives
-    }), 200
+    })
 
 @app.route('/api/projects/<int:project_id>', methods=['PUT'])
 @jwt_required()
@@ -328,6 +522,7 @@ def add_criterion(project_id):
         weight=weight
     )
     db.session.add(criterion)
+    invalidate_project_matrix(project_id)
     project.last_modified = datetime.utcnow()
     db.session.commit()
     
@@ -390,6 +585,7 @@ def delete_criterion(project_id, criterion_id):
     
     # Delete the criterion (cascade will handle related values)
     db.session.delete(criterion)
+    invalidate_project_matrix(project_id)
     project.last_modified = datetime.utcnow()
     db.session.commit()
     
@@ -411,6 +607,10 @@ def add_alternative(project_id):
     if not name:
         return jsonify({'error': 'Alternative name is required'}), 400
     
+    criterion_ids = [value_data['criterion_id'] for value_data in values]
+    if len(criterion_ids) != len(set(criterion_ids)):
+        return jsonify({'error': 'Each criterion may only have one value'}), 400
+    
     alternative = Alternative(project_id=project_id, name=name)
     db.session.add(alternative)
     db.session.flush()  # Get the ID
@@ -424,6 +624,7 @@ def add_alternative(project_id):
         )
         db.session.add(value)
     
+    invalidate_project_matrix(project_id)
     project.last_modified = datetime.utcnow()
     db.session.commit()
     
@@ -454,6 +655,10 @@ def update_alternative(project_id, alternative_id):
     if not name:
         return jsonify({'error': 'Alternative name is required'}), 400
     
+    criterion_ids = [value_data['criterion_id'] for value_data in values]
+    if len(criterion_ids) != len(set(criterion_ids)):
+        return jsonify({'error': 'Each criterion may only have one value'}), 400
+    
     # Update alternative name
     alternative.name = name
     
@@ -468,6 +673,7 @@ def update_alternative(project_id, alternative_id):
         )
         db.session.add(value)
     
+    invalidate_project_matrix(project_id)
     project.last_modified = datetime.utcnow()
     db.session.commit()
     
@@ -493,6 +699,7 @@ def delete_alternative(project_id, alternative_id):
     
     # Delete the alternative (cascade will handle related values)
     db.session.delete(alternative)
+    invalidate_project_matrix(project_id)
     project.last_modified = datetime.utcnow()
     db.session.commit()
     
@@ -502,7 +709,10 @@ def delete_alternative(project_id, alternative_id):
 @jwt_required()
 def calculate_topsis(project_id):
     user_id = get_jwt_identity()
-    project = Project.query.filter_by(id=project_id, user_id=user_id).first()
+    project = Project.query.options(
+        selectinload(Project.criteria),
+        selectinload(Project.alternatives)
+    ).filter_by(id=project_id, user_id=user_id).first()
     
     if not project:
         return jsonify({'error': 'Project not found'}), 404
@@ -512,33 +722,32 @@ def calculate_topsis(project_id):
     
     # Prepare data for calculation
     criteria_weights = [c.weight for c in project.criteria]
-    criteria_types = [c.criterion_type for c in project.criteria]
+    is_benefit = np.fromiter((c.is_benefit for c in project.criteria), dtype=np.bool_, count=len(project.criteria))
     
-    # Create alternatives data matrix
-    alternatives_data = []
-    alternative_names = []
+    alternative_names = [a.name for a in project.alternatives]
     
-    for alt in project.alternatives:
-        alternative_names.append(alt.name)
-        row = []
-        for crit in project.criteria:
-            value = next((v.value for v in alt.values if v.criterion_id == crit.id), 0)
-            row.append(value)
-        alternatives_data.append(row)
+    # Load the column-major alternatives data matrix
+    alternatives_data = load_project_matrix(project)
     
     # Perform TOPSIS calculation
-    results = perform_topsis_calculation(alternatives_data, criteria_weights, criteria_types)
+    results = perform_topsis_calculation(alternatives_data, criteria_weights, is_benefit)
     
     # Add alternative names to results
     results['alternative_names'] = alternative_names
     results['criteria_names'] = [c.name for c in project.criteria]
     
     # Create ranking
-    preference_values = results['preference_values']
-    ranking = sorted(enumerate(preference_values), key=lambda x: x[1], reverse=True)
-    results['ranking'] = [{'rank': i+1, 'alternative_index': rank[0], 'alternative_name': alternative_names[rank[0]], 'value': rank[1]} for i, rank in enumerate(ranking)]
-    
-    return jsonify(results), 200
+    V = results['preference_values']
+    order = np.argsort(-V, kind='stable')
+    results['ranking'] = [{'rank': i+1, 'alternative_index': int(idx), 'alternative_name': alternative_names[idx], 'value': V[idx]} for i, idx in enumerate(order)]
+    
+    if request.accept_mimetypes.best_match(['application/json', 'application/msgpack']) == 'application/msgpack':
+        response = msgpackify(results)
+    else:
+        response = ojsonify(results)
+    # The body format depends on the Accept header
+    response.vary.add('Accept')
+    return response
 
 @app.route('/api/upload-csv', methods=['POST'])
 @jwt_required()
@@ -551,8 +760,15 @@ def upload_csv():
         return jsonify({'error': 'No file selected'}), 400
     
     try:
-        # Read CSV file
-        df = pd.read_csv(file)
+        # Read CSV file with Arrow's multithreaded parser. Everything is read as
+        # strings so Arrow does not turn date-like values into dates, then the
+        # numeric columns are converted back.
+        df = pd.read_csv(file, engine='pyarrow', dtype=str)
+        for column in df.columns:
+            try:
+                df[column] = pd.to_numeric(df[column])
+            except (ValueError, TypeError):
+                pass
         
         # Return preview data (now returning all data)
         return jsonify({
@@ -584,36 +800,35 @@ def import_csv():
         db.session.flush()
         
         # Create criteria
-        criteria_map = {}
-        for crit_config in criteria_config:
-            criterion = Criterion(
-                project_id=project.id,
-                name=crit_config['name'],
-                criterion_type=crit_config['type'],
-                weight=crit_config['weight']
-            )
-            db.session.add(criterion)
-            db.session.flush()
-            criteria_map[crit_config['name']] = criterion.id
+        criteria = [Criterion(
+            project_id=project.id,
+            name=crit_config['name'],
+            criterion_type=crit_config['type'],
+            weight=crit_config['weight']
+        ) for crit_config in criteria_config]
+        db.session.add_all(criteria)
+        db.session.flush()
+        criteria_map = {c.name: c.id for c in criteria}
+        
+        # Create alternatives in one bulk insert, collecting the generated IDs
+        alternative_rows = [{
+            'project_id': project.id,
+            'name': row[column_mapping['alternative_name']]
+        } for row in csv_data]
+        db.session.bulk_insert_mappings(Alternative, alternative_rows, return_defaults=True)
         
-        # Create alternatives and values
-        for row in csv_data:
-            alt_name = row[column_mapping['alternative_name']]
-            alternative = Alternative(project_id=project.id, name=alt_name)
-            db.session.add(alternative)
-            db.session.flush()
-            
-            # Add values for each criterion
-            for crit_config in criteria_config:
-                crit_name = crit_config['name']
-                if crit_name in column_mapping:
-                    value = float(row[column_mapping[crit_name]])
-                    alt_value = AlternativeCriterionValue(
-                        alternative_id=alternative.id,
-                        criterion_id=criteria_map[crit_name],
-                        value=value
-                    )
-                    db.session.add(alt_value)
+        # Add values for each criterion in one bulk insert
+        mapped_criteria = [
+            (criteria_map[crit_config['name']], column_mapping[crit_config['name']])
+            for crit_config in criteria_config
+            if crit_config['name'] in column_mapping
+        ]
+        value_rows = [{
+            'alternative_id': alternative['id'],
+            'criterion_id': criterion_id,
+            'value': float(row[column])
+        } for row, alternative in zip(csv_data, alternative_rows) for criterion_id, column in mapped_criteria]
+        db.session.bulk_insert_mappings(AlternativeCriterionValue, value_rows)
         
         db.session.commit()
         
@@ -636,9 +851,13 @@ def update_theme():
     if theme not in ['light', 'dark']:
         return jsonify({'error': 'Invalid theme'}), 400
     
-    user = User.query.get(user_id)
-    user.theme_preference = theme
+    updated = User.query.filter_by(id=user_id).update({'theme_preference': theme})
     db.session.commit()
+    with user_cache_lock:
+        user_cache.pop(user_id, None)
+    
+    if not updated:
+        return jsonify({'error': 'User not found'}), 404
     
     return jsonify({'message': 'Theme updated successfully'}), 200
 
@@ -646,14 +865,10 @@ def update_theme():
 @jwt_required()
 def get_current_user():
     user_id = get_jwt_identity()
-    user = User.query.get(user_id)
+    user = get_user_cached(user_id)
     if not user:
         return jsonify({'error': 'User not found'}), 404
-    return jsonify({
-        'id': user.id,
-        'email': user.email,
-        'theme_preference': user.theme_preference
-    }), 200
+    return jsonify(user), 200
 
 if __name__ == '__main__':
     with app.app_context():
@@ -0,0 +1,10 @@
+worker_class = 'gthread'
+workers = 4
+threads = 8
+
+
+def on_starting(server):
+    # Create any missing tables once in the master, before workers are forked
+    from app import app, db
+    with app.app_context():
+        db.create_all()